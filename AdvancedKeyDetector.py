@@ -17,10 +17,42 @@ MINOR_PROFILE = np.array([6.33, 2.68, 3.52, 5.38, 2.60,
 PITCH_CLASSES = ["C", "C#", "D", "D#", "E", 
                  "F", "F#", "G", "G#", "A", "A#", "B"]
 
-def estimate_bpm(y, sr):
-    """Use librosa's beat_track to estimate BPM from the percussive component."""
+# Row s holds the indices of np.roll(chroma, -s): the chroma rotated so
+# PITCH_CLASSES[s] sits where the profiles expect their tonic.
+ROTATIONS = (np.arange(12)[:, None] + np.arange(12)[None, :]) % 12
+
+# Minor before major for each tonic, so np.argmax over the 24 scores breaks
+# ties the way key estimation always has: minor beats major on the same
+# tonic, and otherwise the earliest tonic wins.
+KEY_PROFILES = np.stack([MINOR_PROFILE, MAJOR_PROFILE], axis=1)  # shape: (12, 2)
+KEY_NAMES = [f"{note} {mode}"
+             for note in PITCH_CLASSES
+             for mode in ("minor", "major")]
+
+# Hop size librosa's onset, tempogram and chroma features use by default
+HOP_LENGTH = 512
+
+# librosa's beat_track tempo settings, reproduced by the batch estimator
+START_BPM = 120.0
+STD_BPM = 1.0
+MAX_TEMPO = 320.0
+AC_SIZE = 8.0
+
+# chroma_cqt's default CQT resolution (3 bins per semitone), which it also
+# uses to estimate tuning
+CHROMA_BINS_PER_OCTAVE = 36
+
+# Files per batch when labelling a folder with --batch
+BATCH_SIZE = 16
+
+def estimate_bpm(y, sr, y_percussive=None):
+    """
+    Use librosa's beat_track to estimate BPM from the percussive component.
+    Pass 'y_percussive' if HPSS has already been run on 'y'.
+    """
     # Separate harmonic/percussive
-    _, y_percussive = librosa.effects.hpss(y)
+    if y_percussive is None:
+        _, y_percussive = librosa.effects.hpss(y)
     # Estimate tempo
     tempo, _ = librosa.beat.beat_track(y=y_percussive, sr=sr)
     
@@ -30,55 +62,189 @@ def estimate_bpm(y, sr):
         tempo = tempo[0]
     return round(float(tempo))
 
-def estimate_key_advanced(y, sr):
+def estimate_key_advanced(y, sr, y_harmonic=None):
     """
     Estimate the musical key (major or minor) by:
-      1) Separating harmonic from percussive audio.
+      1) Separating harmonic from percussive audio (skipped if 'y_harmonic' is passed in).
       2) Computing chroma from the harmonic portion.
-      3) Shifting the chroma and matching against major/minor templates 
+      3) Shifting the chroma and matching against major/minor templates
          to find the best key fit.
     """
     # 1) Harmonic-percussive separation
-    y_harmonic, _ = librosa.effects.hpss(y)
+    if y_harmonic is None:
+        y_harmonic, _ = librosa.effects.hpss(y)
 
     # 2) Compute chroma from the harmonic signal
     chroma = librosa.feature.chroma_cqt(y=y_harmonic, sr=sr)
     chroma_avg = np.mean(chroma, axis=1)  # shape: (12,)
 
-    best_score = float("-inf")
-    best_key = None
-
-    # 3) Try all 12 possible rotations (each pitch as "C") for major/minor
-    for semitone_shift in range(12):
-        rotated = np.roll(chroma_avg, -semitone_shift)
+    # 3) Score all 12 rotations against the major/minor templates at once
+    scores = score_keys(chroma_avg)
+    return KEY_NAMES[int(np.argmax(scores))]
 
-        major_score = np.dot(rotated, MAJOR_PROFILE)
-        minor_score = np.dot(rotated, MINOR_PROFILE)
-
-        if major_score > minor_score:
-            if major_score > best_score:
-                best_score = major_score
-                note_name = PITCH_CLASSES[semitone_shift]
-                best_key = f"{note_name} major"
-        else:
-            if minor_score > best_score:
-                best_score = minor_score
-                note_name = PITCH_CLASSES[semitone_shift]
-                best_key = f"{note_name} minor"
-
-    return best_key
+def score_keys(chroma_avg):
+    """
+    Scores (..., 12) average chroma against every key, returning (..., 24)
+    scores ordered like KEY_NAMES.
+    """
+    rotated = chroma_avg[..., ROTATIONS]  # shape: (..., 12 tonics, 12)
+    return (rotated @ KEY_PROFILES).reshape(chroma_avg.shape[:-1] + (24,))
 
 def detect_key_bpm(file_path):
-    """Load audio, estimate BPM, estimate key."""
+    """Load audio, separate it once, then estimate BPM and key from the two halves."""
     y, sr = librosa.load(file_path)
-    bpm = estimate_bpm(y, sr)
-    key = estimate_key_advanced(y, sr)
+    y_harmonic, y_percussive = librosa.effects.hpss(y)
+    bpm = estimate_bpm(y, sr, y_percussive)
+    key = estimate_key_advanced(y, sr, y_harmonic)
     return bpm, key
 
-def label_files_with_key_bpm(input_folder):
+def pad_signals(signals):
+    """
+    Zero-pads 1-D signals to a common length.
+    Returns the (n, max_len) float32 batch and each signal's original length.
+    """
+    lengths = np.array([len(y) for y in signals])
+    batch = np.zeros((len(signals), lengths.max()), dtype=np.float32)
+    for i, y in enumerate(signals):
+        batch[i, :len(y)] = y
+    return batch, lengths
+
+def masked_frame_mean(features, n_frames):
+    """
+    Averages (n, bins, frames) features over each row's first n_frames[i]
+    frames only, so frames belonging to padding never reach the mean.
+    """
+    mask = np.arange(features.shape[-1])[None, :] < n_frames[:, None]
+    mask = mask[:, None, :]
+    return (features * mask).sum(axis=-1) / np.maximum(mask.sum(axis=-1), 1)
+
+def estimate_bpm_batch(y_percussive, sr, lengths):
+    """
+    Batched equivalent of estimate_bpm for an (n, samples) percussive batch.
+
+    Onset envelopes are taken per signal (with beat_track's median
+    aggregation) so padding never enters them. Each envelope gets the same
+    linear-ramp edges tempogram(center=True) would give it on its own, and
+    then all of them go through one uncentered tempogram call. Frame t of
+    every row then sees exactly the window the per-signal tempogram uses.
+    beat_track's log-normal tempo prior is applied to the whole batch.
+    Signals without any onsets get 0 BPM, as beat_track gives them.
+    """
+    win_length = int(librosa.time_to_frames(AC_SIZE, sr=sr, hop_length=HOP_LENGTH))
+    half = win_length // 2
+
+    envelopes = [
+        librosa.onset.onset_strength(y=y[:n], sr=sr, hop_length=HOP_LENGTH, aggregate=np.median)
+        for y, n in zip(y_percussive, lengths)
+    ]
+    n_frames = np.array([len(env) for env in envelopes])
+    padded = np.zeros((len(envelopes), n_frames.max() + 2 * half))
+    for i, env in enumerate(envelopes):
+        padded[i, :len(env) + 2 * half] = np.pad(env, half, mode="linear_ramp", end_values=0)
+
+    tempogram = librosa.feature.tempogram(
+        onset_envelope=padded, sr=sr, hop_length=HOP_LENGTH, win_length=win_length, center=False
+    )
+    tempogram_avg = masked_frame_mean(tempogram, n_frames)  # shape: (n, win_length)
+
+    bpms = librosa.tempo_frequencies(win_length, hop_length=HOP_LENGTH, sr=sr)
+    logprior = -0.5 * ((np.log2(bpms) - np.log2(START_BPM)) / STD_BPM) ** 2
+    logprior[:np.argmax(bpms < MAX_TEMPO)] = -np.inf
+
+    best_period = np.argmax(np.log1p(1e6 * tempogram_avg) + logprior, axis=-1)
+    tempos = np.round(bpms[best_period]).astype(int)
+
+    # beat_track reports 0 BPM when there are no onsets at all (e.g. silence)
+    tempos[[not env.any() for env in envelopes]] = 0
+    return tempos
+
+def estimate_key_batch(y_harmonic, sr, lengths):
+    """
+    Batched equivalent of estimate_key_advanced for an (n, samples) harmonic batch.
+
+    Tuning is estimated per signal, as chroma_cqt would on its own, so one
+    detuned file can't skew the rest. Signals with the same tuning and length
+    share a single chroma_cqt call. Grouping by length too keeps padding out
+    of the CQT, so every signal's chroma matches the per-file path exactly.
+    Returns (keys, confidences). Confidence is how far the best key's score
+    sits above the runner-up, relative to the best score (0 = a tie).
+    """
+    tunings = np.array([
+        librosa.estimate_tuning(y=y[:n], sr=sr, bins_per_octave=CHROMA_BINS_PER_OCTAVE)
+        for y, n in zip(y_harmonic, lengths)
+    ])
+
+    chroma_avg = np.zeros((len(lengths), 12))
+    for tuning, length in set(zip(tunings, lengths)):
+        rows = np.flatnonzero((tunings == tuning) & (lengths == length))
+        chroma = librosa.feature.chroma_cqt(
+            y=y_harmonic[rows, :length], sr=sr, hop_length=HOP_LENGTH,
+            bins_per_octave=CHROMA_BINS_PER_OCTAVE, tuning=tuning
+        )
+        chroma_avg[rows] = np.mean(chroma, axis=-1)
+
+    scores = score_keys(chroma_avg)  # shape: (n, 24)
+    ranked = np.sort(scores, axis=-1)
+    best, runner_up = ranked[:, -1], ranked[:, -2]
+    confidences = np.divide(best - runner_up, best, out=np.zeros_like(best), where=best > 0)
+
+    keys = np.array(KEY_NAMES)[np.argmax(scores, axis=-1)]
+    return keys, confidences
+
+def estimate_key_bpm_batch(signals, sr):
+    """
+    Estimates BPM and key for many equal-rate 1-D signals at once.
+    Each signal goes through HPSS once, like detect_key_bpm, then the halves
+    are padded into 2-D arrays for the batched tempogram, tempo prior and
+    template scoring. chroma_cqt is only shared between signals of the same
+    tuning and length.
+    Returns (tempos, keys, confidences) arrays, one entry per signal.
+    Results don't depend on which other signals share the batch.
+    """
+    # HPSS stays per signal: a padded batch measured no faster, and the
+    # padding would leak into its median filters at each signal's end.
+    separated = [librosa.effects.hpss(y) for y in signals]
+    y_harmonic, lengths = pad_signals([harmonic for harmonic, _ in separated])
+    y_percussive, _ = pad_signals([percussive for _, percussive in separated])
+    tempos = estimate_bpm_batch(y_percussive, sr, lengths)
+    keys, confidences = estimate_key_batch(y_harmonic, sr, lengths)
+    return tempos, keys, confidences
+
+def detect_key_bpm_batch(file_paths):
+    """Load every file at librosa's default rate, then estimate BPM & key in one batch."""
+    signals = []
+    sr = None
+    for file_path in file_paths:
+        y, sr = librosa.load(file_path)
+        signals.append(y)
+    return estimate_key_bpm_batch(signals, sr)
+
+def rename_with_key_bpm(input_folder, old_name, bpm, key):
+    """
+    Renames 'old_name' in 'input_folder' to include BPM & key:
+    'MySong_bass.mp3' -> 'MySong_120BPM_G# major_bass.mp3'
+    """
+    old_path = os.path.join(input_folder, old_name)
+    base, ext = os.path.splitext(old_name)  # e.g. "MySong_bass", ".mp3"
+    parts = base.rsplit("_", 1)
+    if len(parts) == 2:
+        # e.g. "MySong", "bass"
+        stem_name, instrument = parts
+        # Insert BPM/Key between them
+        new_base = f"{stem_name}_{bpm}BPM_{key}_{instrument}"
+    else:
+        # No underscore => just append
+        new_base = f"{base}_{bpm}BPM_{key}"
+
+    new_name = f"{new_base}{ext}"  # keep the original extension (.mp3 or .wav)
+    new_path = os.path.join(input_folder, new_name)
+    os.rename(old_path, new_path)
+    print(f"✅ Renamed: {old_name} -> {new_name}")
+
+def label_files_with_key_bpm(input_folder, batch=False):
     """
     For each .mp3 or .wav in 'input_folder':
-    1) Detect key & BPM
+    1) Detect key & BPM (in batches of BATCH_SIZE files if 'batch' is set)
     2) Rename the file:
        'MySong_bass.mp3' -> 'MySong_120BPM_G# major_bass.mp3'
     """
@@ -88,32 +254,28 @@ def label_files_with_key_bpm(input_folder):
         print(f"⚠️ No .mp3/.wav files found in '{input_folder}'")
         return
 
-    for old_name in files:
-        old_path = os.path.join(input_folder, old_name)
-        bpm, key = detect_key_bpm(old_path)
-
-        base, ext = os.path.splitext(old_name)  # e.g. "MySong_bass", ".mp3"
-        parts = base.rsplit("_", 1)
-        if len(parts) == 2:
-            # e.g. "MySong", "bass"
-            stem_name, instrument = parts
-            # Insert BPM/Key between them
-            new_base = f"{stem_name}_{bpm}BPM_{key}_{instrument}"
-        else:
-            # No underscore => just append
-            new_base = f"{base}_{bpm}BPM_{key}"
-
-        new_name = f"{new_base}{ext}"  # keep the original extension (.mp3 or .wav)
-        new_path = os.path.join(input_folder, new_name)
-        os.rename(old_path, new_path)
-        print(f"✅ Renamed: {old_name} -> {new_name}")
+    if not batch:
+        for old_name in files:
+            bpm, key = detect_key_bpm(os.path.join(input_folder, old_name))
+            rename_with_key_bpm(input_folder, old_name, bpm, key)
+        return
+
+    # Batch similar-length files together so little time goes on padding
+    files.sort(key=lambda f: os.path.getsize(os.path.join(input_folder, f)))
+    for start in range(0, len(files), BATCH_SIZE):
+        names = files[start:start + BATCH_SIZE]
+        tempos, keys, _ = detect_key_bpm_batch([os.path.join(input_folder, f) for f in names])
+        for old_name, bpm, key in zip(names, tempos, keys):
+            rename_with_key_bpm(input_folder, old_name, bpm, key)
 
 def main():
     """
     Usage:
-        python AdvancedKeyDetector.py [input_folder]
+        python AdvancedKeyDetector.py [input_folder] [--batch]
 
     If no input_folder is provided, defaults to 'Data'.
+    Pass --batch to analyse files in batches, which is much quicker for
+    libraries of short stems and loops.
 
     This script:
       - For each .mp3/.wav file in [input_folder],
@@ -121,8 +283,11 @@ def main():
         - estimates key (major/minor) from the harmonic signal
         - renames the file to include BPM & key in the filename
     """
-    if len(sys.argv) > 1:
-        input_folder = sys.argv[1]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    batch = "--batch" in sys.argv[1:]
+
+    if args:
+        input_folder = args[0]
     else:
         input_folder = "Data"
 
@@ -130,7 +295,7 @@ def main():
         print(f"❌ '{input_folder}' not found.")
         sys.exit(1)
 
-    label_files_with_key_bpm(input_folder)
+    label_files_with_key_bpm(input_folder, batch)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,102 @@
+import sys
+import time
+import librosa
+import numpy as np
+from AdvancedKeyDetector import (
+    MAJOR_PROFILE, PITCH_CLASSES, estimate_bpm, estimate_key_advanced, estimate_key_bpm_batch
+)
+
+SAMPLE_RATE = 22050  # librosa.load's default rate, which detect_key_bpm uses
+
+def make_synthetic_loop(duration, sr, bpm, tonic, detune=0.0, seed=0):
+    """
+    A drum-and-bass loop with a known answer at 'bpm' in PITCH_CLASSES[tonic] major:
+    kick on beats 1 and 3, snare on 2 and 4, closed hats on eighths,
+    a bass line on the tonic and a sustained triad. 'detune' shifts every
+    pitch by that fraction of a semitone.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration * sr)) / sr
+    beat = 60.0 / bpm
+
+    bar_phase = np.mod(t, 4 * beat)
+    kick_phase = np.mod(bar_phase, 2 * beat)
+    kick = np.sin(2 * np.pi * 60 * kick_phase * (1 + np.exp(-kick_phase * 30))) * np.exp(-kick_phase * 12)
+    snare_phase = np.mod(bar_phase - beat, 2 * beat)
+    snare = (rng.standard_normal(len(t)) * 0.5 + np.sin(2 * np.pi * 190 * snare_phase)) * np.exp(-snare_phase * 25)
+    hat_phase = np.mod(t, beat / 2)
+    hat = np.diff(rng.standard_normal(len(t) + 1)) * np.exp(-hat_phase * 90) * 0.15
+    drums = 0.6 * kick + 0.4 * snare + hat
+
+    root = 261.63 * 2 ** ((tonic + detune) / 12)  # C4 shifted up to the tonic
+    bass = 0.3 * np.sin(2 * np.pi * root / 4 * t) * (0.6 + 0.4 * np.exp(-np.mod(t, beat) * 4))
+    chord = sum(0.15 * np.sin(2 * np.pi * root * 2 ** (step / 12) * t) for step in (0, 4, 7))
+    return (drums + bass + chord).astype(np.float32)
+
+def estimate_per_file(y, sr):
+    """The per-file path as detect_key_bpm runs it: one HPSS shared by BPM and key."""
+    y_harmonic, y_percussive = librosa.effects.hpss(y)
+    return estimate_bpm(y, sr, y_percussive), estimate_key_advanced(y, sr, y_harmonic)
+
+def main():
+    """
+    Usage:
+        python BenchmarkKeyDetector.py [num_loops] [duration_seconds]
+
+    Defaults to 32 loops of up to 8 seconds each. Lengths range from a
+    quarter of that up to the full duration, and every fourth loop is detuned,
+    so the batch path has to deal with padding and mixed tunings. One extra
+    silent loop checks the no-onset case.
+
+    Estimates BPM and key for synthetic loops with the per-file path (one
+    HPSS per file, like detect_key_bpm) and with estimate_key_bpm_batch, then
+    reports throughput of each and how often the two paths agree. Both paths
+    run the same per-signal HPSS, so the speed-up is the batching gain alone.
+    """
+    num_loops = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 8.0
+
+    rng = np.random.default_rng(0)
+    bpms = rng.integers(80, 160, size=num_loops)
+    tonics = rng.integers(0, len(MAJOR_PROFILE), size=num_loops)
+    durations = duration * rng.uniform(0.25, 1.0, size=num_loops)
+    detunes = np.where(np.arange(num_loops) % 4 == 3, rng.uniform(-0.4, 0.4, size=num_loops), 0.0)
+    loops = [make_synthetic_loop(d, SAMPLE_RATE, b, k, detune=dt, seed=i)
+             for i, (d, b, k, dt) in enumerate(zip(durations, bpms, tonics, detunes))]
+    loops.append(np.zeros(int(duration / 2 * SAMPLE_RATE), dtype=np.float32))
+    print(f"🎧 Benchmarking {num_loops} synthetic loop(s) of up to {duration:.0f}s, plus one silent loop")
+
+    # Untimed warm-up so neither path pays for librosa's first-call JIT compilation
+    estimate_per_file(loops[0], SAMPLE_RATE)
+    estimate_key_bpm_batch(loops[:2], SAMPLE_RATE)
+
+    start = time.perf_counter()
+    single = [estimate_per_file(y, SAMPLE_RATE) for y in loops]
+    single_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tempos, keys, confidences = estimate_key_bpm_batch(loops, SAMPLE_RATE)
+    batch_time = time.perf_counter() - start
+
+    # Same loops re-batched in reverse order and split in two; nothing should move
+    half = len(loops) // 2
+    regrouped = [estimate_key_bpm_batch(loops[::-1][:half], SAMPLE_RATE),
+                 estimate_key_bpm_batch(loops[::-1][half:], SAMPLE_RATE)]
+    re_tempos, re_keys, re_confidences = (np.concatenate(parts)[::-1] for parts in zip(*regrouped))
+
+    expected_keys = [f"{PITCH_CLASSES[k]} major" for k in tonics]
+    bpm_agree = np.mean([s[0] == b for s, b in zip(single, tempos)])
+    key_agree = np.mean([s[1] == k for s, k in zip(single, keys)])
+
+    print(f"\n📊 per-file: {single_time:.2f}s ({len(loops) / single_time:.1f} files/s)")
+    print(f"📊 batch:    {batch_time:.2f}s ({len(loops) / batch_time:.1f} files/s, "
+          f"{single_time / batch_time:.2f}x)")
+    print(f"   BPM agreement: {bpm_agree:.0%}, key agreement: {key_agree:.0%} "
+          f"(silent loop: {tempos[-1]} BPM, {keys[-1]})")
+    print(f"   Regrouped batches: BPM {np.mean(re_tempos == tempos):.0%} / key {np.mean(re_keys == keys):.0%} "
+          f"unchanged, max confidence change {np.max(np.abs(re_confidences - confidences)):.2g}")
+    print(f"   Batch key accuracy vs ground truth: {np.mean(keys[:-1] == np.array(expected_keys)):.0%}, "
+          f"mean confidence {np.mean(confidences[:-1]):.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import sys
+import time
+import numpy as np
+import torch
+from Splitter import SEPARATION_PROFILES, load_separation_model, separate_waveform
+
+def make_synthetic_stems(duration, sr, seed=0):
+    """
+    Builds a dict of stereo (2, samples) float32 stems shaped like a real mix:
+    kick/hat drums, a sub bass line, a vibrato "vocal" and a sustained chord for "other".
+    """
+    rng = np.random.default_rng(seed)
+    n = int(duration * sr)
+    t = np.arange(n) / sr
+    beat = 0.5  # 120 BPM
+
+    # Drums: decaying low thump on every beat, noise hat on the off-beats
+    phase = np.mod(t, beat)
+    kick = np.sin(2 * np.pi * 55 * phase) * np.exp(-phase * 30)
+    off_phase = np.mod(t + beat / 2, beat)
+    hat = rng.standard_normal(n) * np.exp(-off_phase * 80) * 0.3
+    drums = kick + hat
+
+    # Bass: root note changing every bar
+    roots = np.array([55.0, 55.0 * 2 ** (5 / 12), 55.0 * 2 ** (7 / 12), 55.0])
+    bar = (t // (4 * beat)).astype(int) % len(roots)
+    bass = 0.6 * np.sin(2 * np.pi * np.cumsum(roots[bar]) / sr)
+
+    # Vocals: vibrato melody an octave range above the chord
+    melody = 440.0 * 2 ** ((bar * 2) / 12)
+    vibrato = 1 + 0.01 * np.sin(2 * np.pi * 5.5 * t)
+    vocals = 0.4 * np.sin(2 * np.pi * np.cumsum(melody * vibrato) / sr)
+
+    # Other: sustained A major triad with slight harmonics
+    other = sum(
+        0.15 * np.sin(2 * np.pi * f * t) + 0.05 * np.sin(2 * np.pi * 2 * f * t)
+        for f in (220.0, 277.18, 329.63)
+    )
+
+    stems = {}
+    for name, mono, pan in (("drums", drums, 0.5), ("bass", bass, 0.5),
+                            ("vocals", vocals, 0.4), ("other", other, 0.6)):
+        stems[name] = np.stack([mono * (1 - pan), mono * pan]).astype(np.float32)
+    return stems
+
+def sdr(reference, estimate):
+    """Signal-to-distortion ratio in dB (plain energy ratio, no BSS projections)."""
+    noise = reference - estimate
+    return 10 * np.log10((np.sum(reference ** 2) + 1e-12) / (np.sum(noise ** 2) + 1e-12))
+
+def benchmark_profile(profile, fixtures):
+    """
+    Separates every fixture mix with 'profile'.
+    Returns (seconds spent separating, {stem: mean SDR across fixtures}).
+    """
+    model = load_separation_model(profile)
+    elapsed = 0.0
+    scores = {name: [] for name in model.sources}
+
+    for stems in fixtures:
+        mix = torch.from_numpy(sum(stems.values()))
+        start = time.perf_counter()
+        estimates = separate_waveform(mix, model, profile).numpy()
+        elapsed += time.perf_counter() - start
+
+        for estimate, name in zip(estimates, model.sources):
+            if name in stems:
+                scores[name].append(sdr(stems[name], estimate))
+
+    return elapsed, {name: float(np.mean(v)) for name, v in scores.items() if v}
+
+def main():
+    """
+    Usage:
+        python BenchmarkSplitter.py [num_fixtures] [duration_seconds]
+
+    Defaults to 3 fixtures of 20 seconds each.
+
+    Separates synthetic multi-stem mixes with every profile in
+    Splitter.SEPARATION_PROFILES and reports the speed-up and SDR change
+    of each profile relative to "default".
+    """
+    num_fixtures = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 20.0
+
+    sr = load_separation_model("default").samplerate
+    fixtures = [make_synthetic_stems(duration, sr, seed=i) for i in range(num_fixtures)]
+    print(f"🎧 Benchmarking {num_fixtures} synthetic mix(es) of {duration:.0f}s at {sr} Hz")
+
+    results = {}
+    for profile in SEPARATION_PROFILES:
+        print(f"🔄 Running '{profile}' profile...")
+        results[profile] = benchmark_profile(profile, fixtures)
+
+    base_time, base_scores = results["default"]
+    for profile, (elapsed, scores) in results.items():
+        speedup = base_time / elapsed if elapsed > 0 else float("inf")
+        print(f"\n📊 {profile}: {elapsed:.2f}s ({speedup:.2f}x vs default)")
+        for name, score in scores.items():
+            delta = score - base_scores[name]
+            print(f"   {name:>7}: SDR {score:6.2f} dB ({delta:+.2f} dB)")
+
+if __name__ == "__main__":
+    main()
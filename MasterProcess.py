@@ -2,11 +2,80 @@ import sys
 import os
 import subprocess
 import shutil
+from ResourceGovernor import ResourceGovernor, estimate_job_memory
+
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.flac', '.ogg', '.m4a')
+
+# Budget options MasterProcess accepts, each as --name=<positive integer>
+BUDGET_OPTIONS = ("max-cores", "max-memory")
+
+def parse_arguments(argv):
+    """
+    Splits argv into positional arguments and budget options.
+    Exits with a usage error for anything that isn't --name=<positive integer>
+    with a known name.
+    """
+    args, options = [], {}
+    for arg in argv:
+        if not arg.startswith("--"):
+            args.append(arg)
+            continue
+
+        name, _, value = arg[2:].partition("=")
+        if name not in BUDGET_OPTIONS:
+            print(f"❌ Error: Unknown option '{arg}'. Expected --max-cores=N or --max-memory=MB.")
+            sys.exit(1)
+        if not value.isdigit() or int(value) <= 0:
+            print(f"❌ Error: '{arg}' needs a positive whole number, written as --{name}=4.")
+            sys.exit(1)
+        options[name] = int(value)
+    return args, options
+
+def largest_audio_file(folder, stage):
+    """
+    Returns the audio file in 'folder' with the biggest estimated memory
+    footprint for 'stage' (read from headers only), or None if there isn't one.
+    """
+    if not os.path.isdir(folder):
+        return None
+
+    largest, largest_memory = None, -1
+    for filename in os.listdir(folder):
+        if not filename.lower().endswith(AUDIO_EXTENSIONS):
+            continue
+        file_path = os.path.join(folder, filename)
+        try:
+            memory = estimate_job_memory(file_path, stage)
+        except Exception as e:
+            print(f"⚠️ Could not read header of '{file_path}': {e}")
+            continue
+        if memory > largest_memory:
+            largest, largest_memory = file_path, memory
+    return largest
+
+def run_stage(governor, stage, script, script_folder, estimate_folder):
+    """
+    Runs 'script' on 'script_folder' as a governed job: it waits for the
+    memory its largest input needs and gets BLAS/torch threads capped to
+    its share of the governor's core budget.
+    """
+    estimate_file = largest_audio_file(estimate_folder, stage)
+    if estimate_file is None:
+        subprocess.run(["python", script, script_folder], check=True)
+        return
+
+    with governor.job(estimate_file, stage) as job:
+        print(f"   🧮 {job['threads']} thread(s), ~{job['memory'] / 1024 ** 2:.0f} MB estimated")
+        subprocess.run(["python", script, script_folder], check=True, env=job["env"])
 
 def main():
     """
     Usage:
-        python MasterProcess.py [input_folder]
+        python MasterProcess.py [input_folder] [--max-cores=N] [--max-memory=MB]
+
+    --max-cores / --max-memory set the resource budget every stage runs within
+    (GOVERNOR_MAX_CORES / GOVERNOR_MAX_MEMORY_MB in the environment work too).
+    By default it's every available core and 80% of physical memory.
 
     Steps:
       1) Run AdvancedKeyDetector on the input folder -> renames .mp3/.wav files with BPM & Key
@@ -15,32 +84,44 @@ def main():
       4) Run Slicer on the newly created stems folder
       5) Remove the leftover _SplitStems folder
     """
-    # 1) Parse input folder argument
-    if len(sys.argv) > 1:
-        input_folder = sys.argv[1]
+    # 1) Parse input folder and budget arguments
+    args, options = parse_arguments(sys.argv[1:])
+
+    if args:
+        input_folder = args[0]
     else:
         input_folder = "Data"
 
+    max_cores = options.get("max-cores")
+    max_memory = options["max-memory"] * 1024 ** 2 if "max-memory" in options else None
+
     folder_name = os.path.basename(os.path.normpath(input_folder))
     splitted_folder = os.path.join("Output", f"{folder_name}_SplitStems")
+    governor = ResourceGovernor(max_cores=max_cores, max_memory=max_memory)
+    memory_budget = f"{governor.max_memory / 1024 ** 2:.0f} MB" if governor.max_memory else "unlimited memory"
+    print(f"🧮 Budget: {governor.max_cores} core(s), {memory_budget}, "
+          f"{governor.threads_per_job} thread(s) per stage")
 
     # 1) Advanced Key Detection (BPM & Key) on raw audio
     print(f"\n--- Running AdvancedKeyDetector on: {input_folder} ---")
-    subprocess.run(["python", "AdvancedKeyDetector.py", input_folder], check=True)
+    run_stage(governor, "key", "AdvancedKeyDetector.py", input_folder, input_folder)
 
     # 2) Run the Splitter
     print(f"\n--- Running Splitter on: {input_folder} ---")
-    subprocess.run(["python", "Splitter.py", input_folder], check=True)
+    run_stage(governor, "split", "Splitter.py", input_folder, input_folder)
 
     # 3) Run the Reverser (by default references the same input_folder)
     print(f"\n--- Running Reverser on: {input_folder} ---")
-    subprocess.run(["python", "Reverser.py", input_folder], check=True)
+    run_stage(governor, "reverse", "Reverser.py", input_folder, splitted_folder)
 
     # 4) Finally, run the Slicer on the splitted (and optionally reversed) stems folder
     print(f"\n--- Running Slicer on: {splitted_folder} ---")
-    subprocess.run(["python", "Slicer.py", splitted_folder], check=True)
+    run_stage(governor, "slice", "Slicer.py", splitted_folder, splitted_folder)
 
     print("\n✅ Master process complete! Stems have been split, reversed, and sliced.")
+    stats = governor.stats()
+    print(f"   🧮 Peak estimated memory: {stats['peak_memory'] / 1024 ** 2:.0f} MB, "
+          f"total wait: {stats['total_wait']:.1f}s")
 
     # 5) Automatically remove the "_SplitStems" folder
     if os.path.isdir(splitted_folder):
@@ -0,0 +1,223 @@
+import os
+import sys
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+# Environment variables the BLAS/OpenMP runtimes behind numpy, librosa,
+# madmom and torch read when they start up.
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "NUMBA_NUM_THREADS",
+)
+
+# Rough working-set model for each pipeline stage:
+#   base        -> fixed cost (interpreter, libraries, model weights) in bytes
+#   factor      -> peak copies of the decoded float32 signal the stage holds at once
+#   sample_rate -> rate the stage decodes at (None = the file's own rate)
+#   channels    -> channels the stage decodes to (None = the file's own count)
+# Demucs keeps the mix, four sources and its chunked intermediates at the
+# model's 44.1k stereo; librosa's HPSS and CQT need several STFT-sized
+# buffers of its 22.05k mono load; madmom's RNN a few more.
+STAGE_PROFILES = {
+    "split": {"base": 1500 * 1024 ** 2, "factor": 16, "sample_rate": 44100, "channels": 2},
+    "key": {"base": 400 * 1024 ** 2, "factor": 10, "sample_rate": 22050, "channels": 1},
+    "reverse": {"base": 150 * 1024 ** 2, "factor": 2, "sample_rate": None, "channels": None},
+    "slice": {"base": 500 * 1024 ** 2, "factor": 6, "sample_rate": 44100, "channels": None},
+}
+
+# Environment variables that configure a governor's budget when its
+# constructor isn't given one explicitly.
+MAX_CORES_ENV = "GOVERNOR_MAX_CORES"
+MAX_MEMORY_ENV = "GOVERNOR_MAX_MEMORY_MB"
+CONCURRENCY_ENV = "GOVERNOR_CONCURRENCY"
+
+# Set alongside THREAD_ENV_VARS in a governed worker's environment, so the
+# worker can tell a governor's cap apart from thread settings the user made.
+THREADS_ENV = "GOVERNOR_THREADS"
+
+BYTES_PER_SAMPLE = 4  # float32
+
+def available_cores():
+    """Cores this process may run on (respects taskset/cgroup affinity where available)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def total_memory():
+    """Physical memory in bytes, or None if the platform won't say."""
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+def _env_int(name):
+    """Positive integer from environment variable 'name', or None if unset/invalid."""
+    value = os.environ.get(name, "")
+    return int(value) if value.isdigit() and int(value) > 0 else None
+
+def governed_threads():
+    """
+    The thread cap a governor put in this worker's environment, or None if
+    the worker wasn't started by one.
+    """
+    return _env_int(THREADS_ENV)
+
+def limit_threads(threads):
+    """
+    Caps BLAS/OpenMP and torch threads in the current process.
+    The environment variables only affect libraries loaded after this call
+    (and any subprocess started afterwards); torch is adjusted directly if loaded.
+    """
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(threads)
+
+def estimate_job_memory(file_path, stage):
+    """
+    Estimates peak memory in bytes for running 'stage' on 'file_path' from
+    duration x sample rate x channels. The duration comes from the file
+    header only; rate and channels are the ones the stage actually works at.
+    """
+    # Imported here so environments without soundfile (e.g. Splitter's) can
+    # still use the thread helpers above.
+    import soundfile as sf
+
+    profile = STAGE_PROFILES[stage]
+    info = sf.info(file_path)
+    sample_rate = profile["sample_rate"] or info.samplerate
+    channels = profile["channels"] or info.channels
+    samples = int(info.frames / info.samplerate * sample_rate) * channels
+    return profile["base"] + samples * BYTES_PER_SAMPLE * profile["factor"]
+
+class ResourceGovernor:
+    """
+    Admits jobs only while their estimated memory and requested cores fit the
+    configured budget, blocking callers until enough running jobs finish.
+
+    A job too large for the whole budget is still admitted once nothing else
+    is running, so it runs alone instead of waiting forever.
+
+    Budgets left as None come from GOVERNOR_MAX_CORES, GOVERNOR_MAX_MEMORY_MB
+    and GOVERNOR_CONCURRENCY, then from the machine itself. 'concurrency' is
+    how many jobs are expected to run side by side; each gets an equal share
+    of the cores as its thread cap.
+    """
+
+    def __init__(self, max_cores=None, max_memory=None, concurrency=None, memory_fraction=0.8):
+        self.max_cores = max_cores or _env_int(MAX_CORES_ENV) or available_cores()
+        if max_memory is None and _env_int(MAX_MEMORY_ENV):
+            max_memory = _env_int(MAX_MEMORY_ENV) * 1024 ** 2
+        if max_memory is None:
+            physical = total_memory()
+            max_memory = int(physical * memory_fraction) if physical else None
+        self.max_memory = max_memory
+        self.concurrency = concurrency or _env_int(CONCURRENCY_ENV) or 1
+        self.threads_per_job = max(1, self.max_cores // self.concurrency)
+
+        self._lock = threading.Condition()
+        self._cores_in_use = 0
+        self._memory_in_use = 0
+        self._running = 0
+        self._waiting = 0
+        self._admitted = 0
+        self._oversized = 0
+        self._peak_memory = 0
+        self._peak_cores = 0
+        self._total_wait = 0.0
+        self._decisions = deque(maxlen=100)
+
+    def _fits(self, memory, cores):
+        if self._running == 0:
+            return True
+        if self._cores_in_use + cores > self.max_cores:
+            return False
+        if self.max_memory is not None and self._memory_in_use + memory > self.max_memory:
+            return False
+        return True
+
+    def thread_env(self, threads):
+        """A copy of os.environ with every thread-count variable set to 'threads'."""
+        env = dict(os.environ)
+        for var in THREAD_ENV_VARS + (THREADS_ENV,):
+            env[var] = str(threads)
+        return env
+
+    @contextmanager
+    def job(self, file_path, stage, threads=None):
+        """
+        Blocks until a 'stage' job on 'file_path' fits the budget, then yields
+        a dict with the admitted 'threads', estimated 'memory' and an 'env' to
+        pass to subprocess.run so the worker's thread pools respect the cap.
+        Call limit_threads(job["threads"]) instead for in-process work.
+        'threads' defaults to the job's share of the cores (threads_per_job).
+        """
+        threads = max(1, min(threads or self.threads_per_job, self.max_cores))
+        memory = estimate_job_memory(file_path, stage)
+
+        start = time.perf_counter()
+        with self._lock:
+            self._waiting += 1
+            while not self._fits(memory, threads):
+                self._lock.wait()
+            self._waiting -= 1
+
+            waited = time.perf_counter() - start
+            oversized = self.max_memory is not None and memory > self.max_memory
+            if oversized:
+                print(f"⚠️ {stage} job on '{file_path}' needs ~{memory / 1024 ** 2:.0f} MB, "
+                      f"over the {self.max_memory / 1024 ** 2:.0f} MB budget; running it alone.")
+            self._running += 1
+            self._admitted += 1
+            self._oversized += int(oversized)
+            self._cores_in_use += threads
+            self._memory_in_use += memory
+            self._peak_cores = max(self._peak_cores, self._cores_in_use)
+            self._peak_memory = max(self._peak_memory, self._memory_in_use)
+            self._total_wait += waited
+            self._decisions.append({
+                "file": file_path,
+                "stage": stage,
+                "threads": threads,
+                "memory": memory,
+                "waited": waited,
+                "oversized": oversized,
+            })
+
+        try:
+            yield {"threads": threads, "memory": memory, "env": self.thread_env(threads)}
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._cores_in_use -= threads
+                self._memory_in_use -= memory
+                self._lock.notify_all()
+
+    def stats(self):
+        """
+        Snapshot of the budget, current usage, totals and the most recent
+        admission decisions (newest last).
+        """
+        with self._lock:
+            return {
+                "max_cores": self.max_cores,
+                "max_memory": self.max_memory,
+                "concurrency": self.concurrency,
+                "threads_per_job": self.threads_per_job,
+                "cores_in_use": self._cores_in_use,
+                "memory_in_use": self._memory_in_use,
+                "running": self._running,
+                "waiting": self._waiting,
+                "admitted": self._admitted,
+                "oversized": self._oversized,
+                "peak_cores": self._peak_cores,
+                "peak_memory": self._peak_memory,
+                "total_wait": self._total_wait,
+                "decisions": list(self._decisions),
+            }
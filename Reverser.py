@@ -2,6 +2,7 @@ import os
 import sys
 import soundfile as sf
 import numpy as np
+from WavReader import read_wav, mix_into, write_reversed
 
 def combine_stems(stem_files, combined_file):
     """
@@ -17,28 +18,18 @@ def combine_stems(stem_files, combined_file):
         print("⚠️ No stem files to combine.")
         return
 
-    # Load the first file to get sample rate and shape
-    data, sr = sf.read(stem_files[0])
-    combined_data = np.array(data, dtype=np.float32)
-
-    # Add each subsequent stem
-    for stem_file in stem_files[1:]:
-        stem_data, stem_sr = sf.read(stem_file)
+    # Map every stem up front; only the headers are read here
+    stems = [read_wav(stem_file) for stem_file in stem_files]
+    sr = stems[0][1]
+    for stem_file, (_, stem_sr) in zip(stem_files, stems):
         if stem_sr != sr:
             raise ValueError(f"Sample rate mismatch: {stem_file} has SR={stem_sr}, expected {sr}")
 
-        # Ensure same length; if not, pad the shorter array or skip
-        if len(stem_data) < len(combined_data):
-            # Pad the shorter one
-            padded = np.zeros_like(combined_data)
-            padded[:len(stem_data)] = stem_data
-            stem_data = padded
-        elif len(stem_data) > len(combined_data):
-            padded = np.zeros_like(stem_data)
-            padded[:len(combined_data)] = combined_data
-            combined_data = padded
-
-        combined_data += stem_data
+    # Shorter stems are implicitly zero-padded to the longest one
+    longest = max(len(data) for data, _ in stems)
+    combined_data = np.zeros((longest,) + stems[0][0].shape[1:], dtype=np.float32)
+    for data, _ in stems:
+        mix_into(combined_data, data)
 
     sf.write(combined_file, combined_data, sr)
     print(f"✅ Combined stems -> {combined_file}")
@@ -48,11 +39,13 @@ def reverse_wav_file(in_path, out_path=None):
     Reverses in_path and writes to out_path.
     If out_path is None, overwrites in_path.
     """
-    data, sr = sf.read(in_path)
-    reversed_data = np.flipud(data)
+    data, sr = read_wav(in_path)
     if out_path is None:
         out_path = in_path
-    sf.write(out_path, reversed_data, sr)
+    if os.path.abspath(out_path) == os.path.abspath(in_path):
+        # Can't stream out of a mapping of the file we're about to truncate
+        data = np.array(data)
+    write_reversed(data, out_path, sr)
     print(f"✅ Reversed {in_path} -> {out_path}")
 
 def process_reversal(split_folder):
@@ -4,6 +4,7 @@ import numpy as np
 import soundfile as sf
 from madmom.audio import Signal
 from madmom.features.beats import RNNBeatProcessor, DBNBeatTrackingProcessor
+from WavReader import map_wav
 
 # Map the instrument text in the filename to a destination folder
 INSTRUMENT_FOLDER_MAP = {
@@ -35,13 +36,20 @@ def slice_16bars(file_path, out_folder):
     """
     print(f"🎧 Processing 16-bar slices for: {file_path}")
     
-    # Load audio at 44,100 Hz
-    signal = Signal(file_path, sample_rate=44100)
+    # Load audio at 44,100 Hz. 44.1k WAVs (e.g. Demucs stems) are memory-mapped
+    # instead of decoded; anything else is decoded (and resampled if needed)
+    # by madmom. Either way the file is read once: beat detection runs on
+    # this signal, and each slice is written straight from it.
+    mapped = map_wav(file_path, sample_rate=44100)
+    if mapped is not None:
+        signal = Signal(mapped, sample_rate=44100)
+    else:
+        signal = Signal(file_path, sample_rate=44100)
     print(f"   ✅ Loaded Audio Signal: {len(signal)} samples")
     
     # Detect Beats
     beat_processor = RNNBeatProcessor()
-    beat_activation = beat_processor(file_path)
+    beat_activation = beat_processor(signal)
     beat_tracker = DBNBeatTrackingProcessor(beats_per_bar=[4], fps=100)
     beats = beat_tracker(beat_activation)
     print(f"   ✅ Detected Beats: {len(beats)}")
@@ -4,6 +4,7 @@ import numpy as np
 import soundfile as sf
 from madmom.audio import Signal
 from madmom.features.beats import RNNBeatProcessor, DBNBeatTrackingProcessor
+from WavReader import map_wav
 
 def slice_4bars(file_path, out_folder):
     """
@@ -12,13 +13,18 @@ def slice_4bars(file_path, out_folder):
     """
     print(f"🎧 Processing 4-bar slices for: {file_path}")
     
-    # Load audio at 44,100 Hz
-    signal = Signal(file_path, sample_rate=44100)
+    # Load audio at 44,100 Hz (memory-mapped when it's already a 44.1k WAV).
+    # Beat detection reuses it, so the file is only read once.
+    mapped = map_wav(file_path, sample_rate=44100)
+    if mapped is not None:
+        signal = Signal(mapped, sample_rate=44100)
+    else:
+        signal = Signal(file_path, sample_rate=44100)
     print(f"   ✅ Loaded Audio Signal: {len(signal)} samples")
     
     # Detect Beats
     beat_processor = RNNBeatProcessor()
-    beat_activation = beat_processor(file_path)
+    beat_activation = beat_processor(signal)
     beat_tracker = DBNBeatTrackingProcessor(beats_per_bar=[4], fps=100)
     beats = beat_tracker(beat_activation)
     print(f"   ✅ Detected Beats: {len(beats)}")
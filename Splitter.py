@@ -2,36 +2,137 @@ import os
 import sys
 import shutil
 import subprocess
+from ResourceGovernor import governed_threads, limit_threads
 
 SUPPORTED_EXTENSIONS = ('.mp3', '.wav', '.flac', '.ogg', '.m4a')
 
-def run_demucs(input_file, output_dir):
+DEMUCS_MODEL = "htdemucs"
+
+# Separation profiles for run_demucs.
+#   "default" -> the Demucs CLI at its stock quality settings.
+#   "fast"    -> in-process Demucs for CPU previews: no overlap between chunks
+#                (a quarter fewer chunks to run) and int8 dynamic quantization
+#                of the Linear/LSTM layers. shifts=0 only skips the 0.5s random
+#                padding; the stock shifts=1 is already a single pass.
+# segment=None keeps the model's own training segment: htdemucs pads shorter
+# chunks back up to it, so a smaller segment only adds chunks.
+SEPARATION_PROFILES = {
+    "default": {"shifts": 1, "overlap": 0.25, "segment": None, "quantize": False},
+    "fast": {"shifts": 0, "overlap": 0.0, "segment": None, "quantize": True},
+}
+
+# Loaded models, keyed by profile name, so a folder of files only pays
+# for loading (and quantizing) the model once.
+_MODEL_CACHE = {}
+
+def load_separation_model(profile="default"):
+    """
+    Loads the Demucs model for 'profile', quantizing it to int8 if the profile asks for it.
+    """
+    # Imported here so the CLI-only default path doesn't pay for importing torch
+    import torch
+    from demucs.pretrained import get_model
+
+    if profile in _MODEL_CACHE:
+        return _MODEL_CACHE[profile]
+
+    settings = SEPARATION_PROFILES[profile]
+    model = get_model(DEMUCS_MODEL)
+    model.cpu()
+    model.eval()
+    if settings["quantize"]:
+        model = torch.quantization.quantize_dynamic(
+            model, {torch.nn.Linear, torch.nn.LSTM}, dtype=torch.qint8
+        )
+    _MODEL_CACHE[profile] = model
+    return model
+
+def separate_waveform(wav, model, profile="default"):
+    """
+    Separates a (channels, samples) torch tensor already at model.samplerate.
+    Returns a (sources, channels, samples) tensor ordered like model.sources.
+    """
+    import torch
+    from demucs.apply import apply_model
+
+    settings = SEPARATION_PROFILES[profile]
+
+    # Same normalisation the Demucs CLI applies before and after separation
+    ref = wav.mean(0)
+    wav = (wav - ref.mean()) / ref.std()
+    with torch.no_grad():
+        sources = apply_model(
+            model,
+            wav[None],
+            shifts=settings["shifts"],
+            split=True,
+            overlap=settings["overlap"],
+            segment=settings["segment"],
+            device="cpu",
+        )[0]
+    return sources * ref.std() + ref.mean()
+
+def run_demucs_in_process(input_file, temp_output_dir, profile):
+    """
+    Separates 'input_file' without the Demucs CLI, writing stems into the same
+    '<model>/<song>/<stem>.wav' layout the CLI produces under temp_output_dir.
+    """
+    from demucs.audio import AudioFile, save_audio
+
+    # Hold torch and BLAS to the thread cap the resource governor gave this
+    # worker; without one, leave the user's own thread settings alone
+    threads = governed_threads()
+    if threads:
+        limit_threads(threads)
+    model = load_separation_model(profile)
+    wav = AudioFile(input_file).read(
+        streams=0, samplerate=model.samplerate, channels=model.audio_channels
+    )
+    sources = separate_waveform(wav, model, profile)
+
+    base_name = os.path.splitext(os.path.basename(input_file))[0]
+    song_folder = os.path.join(temp_output_dir, DEMUCS_MODEL, base_name)
+    os.makedirs(song_folder, exist_ok=True)
+    for source, name in zip(sources, model.sources):
+        save_audio(source, os.path.join(song_folder, f"{name}.wav"), samplerate=model.samplerate)
+
+def run_demucs(input_file, output_dir, profile="default"):
     """
     Runs Demucs to separate stems from the input audio file, 
     then flattens output filenames into output_dir.
+
+    'profile' picks an entry from SEPARATION_PROFILES; "fast" trades some
+    separation quality for a much quicker CPU run.
     """
     if not os.path.isfile(input_file):
         print(f"❌ Error: Input file '{input_file}' not found.")
         return
 
+    if profile not in SEPARATION_PROFILES:
+        print(f"❌ Error: Unknown separation profile '{profile}'.")
+        return
+
     os.makedirs(output_dir, exist_ok=True)
 
     temp_output_dir = os.path.join(output_dir, "temp")
     os.makedirs(temp_output_dir, exist_ok=True)
 
-    print(f"🔄 Running Demucs on '{input_file}'...")
+    print(f"🔄 Running Demucs on '{input_file}' ({profile} profile)...")
     try:
-        subprocess.run(
-            [
-                "demucs",
-                input_file,
-                "--out",
-                temp_output_dir
-            ],
-            capture_output=True,
-            text=True,
-            check=True
-        )
+        if profile == "default":
+            subprocess.run(
+                [
+                    "demucs",
+                    input_file,
+                    "--out",
+                    temp_output_dir
+                ],
+                capture_output=True,
+                text=True,
+                check=True
+            )
+        else:
+            run_demucs_in_process(input_file, temp_output_dir, profile)
         print(f"✅ Demucs finished processing '{input_file}'.")
         move_demucs_files(temp_output_dir, output_dir, input_file)
     except subprocess.CalledProcessError as e:
@@ -82,7 +183,7 @@ def move_demucs_files(temp_folder, output_folder, input_file):
 
     print("✅ All files have been moved and renamed successfully.")
 
-def process_audio_files(input_folder, output_folder):
+def process_audio_files(input_folder, output_folder, profile="default"):
     """
     Processes all supported audio files in a given folder with Demucs.
     """
@@ -96,19 +197,23 @@ def process_audio_files(input_folder, output_folder):
         if file.lower().endswith(SUPPORTED_EXTENSIONS):
             input_file_path = os.path.join(input_folder, file)
             print(f"\n🎵 Processing file: {input_file_path}")
-            run_demucs(input_file_path, output_folder)
+            run_demucs(input_file_path, output_folder, profile)
 
 def main():
     """
     Usage:
-        python Splitter.py [input_folder]
+        python Splitter.py [input_folder] [--fast]
 
     If [input_folder] is not provided, it defaults to "Data".
     The output folder will be at "Output/<input_folder_name>_SplitStems".
+    Pass --fast to use the quicker, lower-fidelity "fast" separation profile.
     """
-    # 1) Determine input folder
-    if len(sys.argv) > 1:
-        input_dir = sys.argv[1]
+    # 1) Determine input folder and profile
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    profile = "fast" if "--fast" in sys.argv[1:] else "default"
+
+    if args:
+        input_dir = args[0]
     else:
         input_dir = "Data"
     
@@ -118,7 +223,7 @@ def main():
     os.makedirs(output_dir, exist_ok=True)
 
     # 3) Process
-    process_audio_files(input_dir, output_dir)
+    process_audio_files(input_dir, output_dir, profile)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
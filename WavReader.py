@@ -0,0 +1,153 @@
+import os
+import struct
+import numpy as np
+import soundfile as sf
+
+# WAVE format tags we can map straight onto a numpy dtype
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# (format tag, bits per sample) -> little-endian numpy dtype.
+# 24-bit PCM has no numpy dtype, so it goes through the soundfile fallback.
+MAPPABLE_DTYPES = {
+    (WAVE_FORMAT_PCM, 8): np.dtype("u1"),
+    (WAVE_FORMAT_PCM, 16): np.dtype("<i2"),
+    (WAVE_FORMAT_PCM, 32): np.dtype("<i4"),
+    (WAVE_FORMAT_IEEE_FLOAT, 32): np.dtype("<f4"),
+    (WAVE_FORMAT_IEEE_FLOAT, 64): np.dtype("<f8"),
+}
+
+# Frames processed per step when converting or mixing mapped data, so the
+# float32 temporaries stay small no matter how long the stem is.
+BLOCK_FRAMES = 1 << 16
+
+def parse_wav_header(path):
+    """
+    Walks the RIFF chunks of 'path' without reading any sample data.
+    Returns (format_tag, channels, sample_rate, bits_per_sample, data_offset, data_size),
+    or None if the file isn't a plain RIFF/WAVE file or its header is truncated.
+    """
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        riff = f.read(12)
+        if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+            return None
+
+        fmt = None
+        while True:
+            chunk_header = f.read(8)
+            if len(chunk_header) < 8:
+                return None
+            chunk_id, chunk_size = struct.unpack("<4sI", chunk_header)
+
+            if chunk_id == b"fmt ":
+                body = f.read(chunk_size)
+                if len(body) < 16 or len(body) < chunk_size:
+                    return None
+                format_tag, channels, sample_rate, _, _, bits = struct.unpack("<HHIIHH", body[:16])
+                if format_tag == WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                    # The real format tag is the first two bytes of the SubFormat GUID
+                    format_tag = struct.unpack("<H", body[24:26])[0]
+                fmt = (format_tag, channels, sample_rate, bits)
+                if chunk_size % 2:
+                    f.seek(1, os.SEEK_CUR)
+            elif chunk_id == b"data":
+                if fmt is None:
+                    return None
+                data_offset = f.tell()
+                # Streamed writers sometimes leave the size unset; trust the file length instead
+                data_size = min(chunk_size, file_size - data_offset)
+                return fmt + (data_offset, data_size)
+            else:
+                f.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+def map_wav(path, sample_rate=None):
+    """
+    Memory-maps an uncompressed PCM/float WAV file read-only and returns its
+    samples as a view in the file's own sample type, shaped like sf.read:
+    (frames,) for mono, (frames, channels) otherwise. Only the frames you
+    actually index are ever loaded, and the pages are shared through the OS
+    page cache with any other process reading the same stem.
+
+    Returns None if the file can't be mapped (compressed formats, 24-bit PCM,
+    RF64) or, when 'sample_rate' is given, if the file isn't at that rate.
+    """
+    if not path.lower().endswith(".wav"):
+        return None
+    header = parse_wav_header(path)
+    if header is None:
+        return None
+
+    format_tag, channels, file_rate, bits, data_offset, data_size = header
+    dtype = MAPPABLE_DTYPES.get((format_tag, bits))
+    if dtype is None or channels == 0:
+        return None
+    if sample_rate is not None and file_rate != sample_rate:
+        return None
+
+    frames = data_size // (dtype.itemsize * channels)
+    if frames == 0:
+        return np.zeros((0,) if channels == 1 else (0, channels), dtype=dtype)
+    data = np.memmap(path, dtype=dtype, mode="r", offset=data_offset, shape=(frames, channels))
+    if channels == 1:
+        data = data[:, 0]
+    return data
+
+def read_wav(path):
+    """
+    Returns (data, sample_rate) for 'path'. WAV files map_wav can handle come
+    back as zero-copy views; anything else is decoded with soundfile into float32.
+    """
+    data = map_wav(path)
+    if data is not None:
+        return data, parse_wav_header(path)[2]
+
+    data, sample_rate = sf.read(path, dtype="float32")
+    return data, sample_rate
+
+def to_float32(data):
+    """
+    Converts samples returned by read_wav to float32 in [-1, 1), the same
+    scaling soundfile uses. Float32 input is returned unchanged (no copy).
+    """
+    if data.dtype == np.float32:
+        return data
+    if data.dtype == np.uint8:
+        return (data.astype(np.float32) - 128.0) / 128.0
+    if np.issubdtype(data.dtype, np.integer):
+        return data.astype(np.float32) / float(-np.iinfo(data.dtype).min)
+    return data.astype(np.float32)
+
+def mix_into(out, data):
+    """
+    Adds read_wav samples onto the float32 array 'out' block by block,
+    so a mapped stem is never converted to float all at once.
+    'data' may be shorter than 'out'; the remainder is left untouched.
+    """
+    frames = min(len(out), len(data))
+    for start in range(0, frames, BLOCK_FRAMES):
+        end = min(start + BLOCK_FRAMES, frames)
+        out[start:end] += to_float32(data[start:end])
+
+def write_reversed(data, out_path, sample_rate):
+    """
+    Writes 'data' back to front into 'out_path', one block at a time, so a
+    mapped input is reversed without materialising a reversed copy of it.
+    Integer data keeps its sample format; float data is written as PCM_16, like sf.write.
+    """
+    channels = 1 if data.ndim == 1 else data.shape[1]
+    subtype = {
+        np.dtype("u1"): "PCM_U8",
+        np.dtype("<i2"): "PCM_16",
+        np.dtype("<i4"): "PCM_32",
+    }.get(data.dtype, "PCM_16")
+
+    with sf.SoundFile(out_path, mode="w", samplerate=sample_rate, channels=channels, subtype=subtype) as f:
+        for end in range(len(data), 0, -BLOCK_FRAMES):
+            start = max(end - BLOCK_FRAMES, 0)
+            block = data[start:end][::-1]
+            if subtype == "PCM_U8":
+                # soundfile has no uint8 I/O, so hand it floats for 8-bit files
+                block = to_float32(block)
+            f.write(block)